@@ -29,18 +29,23 @@ class MissingCredentials(ValueError):
     """Account is missing `addr` and `mail_pw` config values."""
 
 
+# config values for False and True
+_BOOLSTR = ("0", "1")
+
+
 def get_core_info():
     """get some system info."""
-    from tempfile import NamedTemporaryFile
-
-    with NamedTemporaryFile() as path:
-        path.close()
-        return get_dc_info_as_dict(
-            ffi.gc(
-                lib.dc_context_new(as_dc_charpointer(""), as_dc_charpointer(path.name), ffi.NULL),
-                lib.dc_context_unref,
-            )
-        )
+    from tempfile import TemporaryDirectory
+
+    # the context creates the database and a blob directory next to it,
+    # use a temporary directory so that all of it gets removed again.
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "probe.db")
+        dc_context = lib.dc_context_new(as_dc_charpointer(""), as_dc_charpointer(path), ffi.NULL)
+        try:
+            return get_dc_info_as_dict(dc_context)
+        finally:
+            lib.dc_context_unref(dc_context)
 
 
 def get_dc_info_as_dict(dc_context):
@@ -92,6 +97,8 @@ def __init__(self, db_path, os_name=None, logging=True, closed=False) -> None:
         self._shutdown_event = Event()
         self._event_thread = EventThread(self)
         self._configkeys = self.get_config("sys.config_keys").split()
+        # config key names are passed to the core as utf8 bytes, encode them only once
+        self._configkeys_bytes = {key: key.encode("utf8") for key in self._configkeys}
         hook = hookspec.Global._get_plugin_manager().hook
         hook.dc_account_init(account=self)
 
@@ -125,7 +132,7 @@ def log(self, msg):
             self._pm.hook.ac_log_line(message=msg)
 
     def _check_config_key(self, name: str) -> None:
-        if name not in self._configkeys:
+        if name not in self._configkeys_bytes:
             raise KeyError("{!r} not a valid config key, existing keys: {!r}".format(name, self._configkeys))
 
     def get_info(self) -> Dict[str, str]:
@@ -168,10 +175,12 @@ def set_config(self, name: str, value: Optional[str]) -> None:
         :returns: None
         """
         self._check_config_key(name)
-        namebytes = name.encode("utf8")
-        if namebytes == b"addr" and self.is_configured():
+        namebytes = self._configkeys_bytes[name]
+        if name == "addr" and self.is_configured():
             raise ValueError("can not change 'addr' after account is configured.")
-        if isinstance(value, (int, bool)):
+        if isinstance(value, bool):
+            value = _BOOLSTR[value]
+        elif isinstance(value, int):
             value = str(int(value))
         if value is not None:
             valuebytes = value.encode("utf8")
@@ -186,9 +195,11 @@ def get_config(self, name: str) -> str:
         :returns: unicode value
         :raises: KeyError if no config value was found.
         """
-        if name != "sys.config_keys":
+        if name == "sys.config_keys":
+            namebytes = b"sys.config_keys"
+        else:
             self._check_config_key(name)
-        namebytes = name.encode("utf8")
+            namebytes = self._configkeys_bytes[name]
         res = lib.dc_get_config(self._dc_context, namebytes)
         assert res != ffi.NULL, "config value not found for: {!r}".format(name)
         return from_dc_charpointer(res)
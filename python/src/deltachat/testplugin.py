@@ -1,20 +1,21 @@
 from __future__ import print_function
 
+import collections
+import concurrent.futures
 import fnmatch
 import io
 import os
 import pathlib
-import queue
-import subprocess
+import re
+import selectors
 import sys
 import threading
 import time
 import weakref
 from queue import Queue
-from typing import Callable, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
 import pytest
-import requests
 from _pytest._code import Source
 
 import deltachat
@@ -51,6 +52,11 @@ def pytest_addoption(parser):
         action="store_true",
         help="show events during configure and start io phases of online accounts",
     )
+    parser.addini(
+        "deltachat_logging_hook",
+        default="auto",
+        help="toggle account logging per test phase: 'auto' (only if accounts exist), 'on' or 'off'",
+    )
 
 
 def pytest_configure(config):
@@ -67,22 +73,36 @@ def pytest_configure(config):
     # Additionally make the acfactory use a logging/no-logging default.
 
     class LoggingAspect:
-        def __init__(self):
+        def __init__(self, mode):
             self._accounts = weakref.WeakSet()
+            self._mode = mode
+
+        def _needs_toggle(self, item):
+            if self._mode == "auto":
+                return bool(self._accounts) or "acfactory" in item.funcargs
+            return self._mode == "on"
 
         @deltachat.global_hookimpl
         def dc_account_init(self, account):
             self._accounts.add(account)
 
+        @deltachat.global_hookimpl
+        def dc_account_after_shutdown(self, account):
+            self._accounts.discard(account)
+
         def disable_logging(self, item):
-            for acc in self._accounts:
+            if not self._needs_toggle(item):
+                return
+            for acc in tuple(self._accounts):
                 acc.disable_logging()
             acfactory = item.funcargs.get("acfactory")
             if acfactory:
                 acfactory.set_logging_default(False)
 
         def enable_logging(self, item):
-            for acc in self._accounts:
+            if not self._needs_toggle(item):
+                return
+            for acc in tuple(self._accounts):
                 acc.enable_logging()
             acfactory = item.funcargs.get("acfactory")
             if acfactory:
@@ -112,20 +132,26 @@ def pytest_runtest_teardown(self, item):
             if logging:
                 self.disable_logging(item)
 
-    la = LoggingAspect()
+    logging_hook = config.getini("deltachat_logging_hook")
+    if logging_hook not in ("auto", "on", "off"):
+        raise pytest.UsageError("deltachat_logging_hook must be one of auto, on, off: {!r}".format(logging_hook))
+    la = LoggingAspect(mode=logging_hook)
     config.pluginmanager.register(la)
     deltachat.register_global_plugin(la)
 
 
 def pytest_report_header(config, startdir):
-    info = get_core_info()
-    summary = [
-        "Deltachat core={} sqlite={} journal_mode={}".format(
-            info["deltachat_core_version"],
-            info["sqlite_version"],
-            info["journal_mode"],
+    summary = []
+    # don't create a probing context for runs which only collect tests
+    if not config.getoption("collectonly", False):
+        info = get_core_info()
+        summary.append(
+            "Deltachat core={} sqlite={} journal_mode={}".format(
+                info["deltachat_core_version"],
+                info["sqlite_version"],
+                info["journal_mode"],
+            )
         )
-    ]
 
     cfg = config.option.liveconfig
     if cfg:
@@ -145,10 +171,13 @@ def testprocess(request):
 class TestProcess:
     """A pytest session-scoped instance to help with managing "live" account configurations."""
 
+    MAX_LIVE_CREATED_ACCOUNTS = 10
+
     def __init__(self, pytestconfig):
         self.pytestconfig = pytestconfig
         self._addr2files = {}
         self._configlist = []
+        self._http_session = None
 
     def get_liveconfig_producer(self):
         """provide live account configs, cached on a per-test-process scope
@@ -161,30 +190,76 @@ def get_liveconfig_producer(self):
             pytest.skip("specify DCC_NEW_TMP_EMAIL or --liveconfig to provide live accounts")
 
         if not liveconfig_opt.startswith("http"):
-            for line in open(liveconfig_opt):
-                if line.strip() and not line.strip().startswith("#"):
-                    d = {}
-                    for part in line.split():
-                        name, value = part.split("=")
-                        d[name] = value
-                    self._configlist.append(d)
+            # only parse the file once per test process, later
+            # ACFactory instances re-use the already parsed configs
+            if not self._configlist:
+                with open(liveconfig_opt) as f:
+                    for line in f:
+                        if line.strip() and not line.strip().startswith("#"):
+                            d = {}
+                            for part in line.split():
+                                name, sep, value = part.partition("=")
+                                if not sep:
+                                    raise ValueError(
+                                        "invalid liveconfig setting {!r}, expected NAME=VALUE".format(part)
+                                    )
+                                d[name] = value
+                            self._configlist.append(d)
 
             yield from iter(self._configlist)
         else:
-            MAX_LIVE_CREATED_ACCOUNTS = 10
-            for index in range(MAX_LIVE_CREATED_ACCOUNTS):
+            for index in range(self.MAX_LIVE_CREATED_ACCOUNTS):
                 try:
                     yield self._configlist[index]
                 except IndexError:
-                    res = requests.post(liveconfig_opt)
-                    if res.status_code != 200:
-                        pytest.fail("newtmpuser count={} code={}: '{}'".format(index, res.status_code, res.text))
-                    d = res.json()
-                    config = dict(addr=d["email"], mail_pw=d["password"])
-                    print("newtmpuser {}: addr={}".format(index, config["addr"]))
+                    config = self._request_liveconfig(liveconfig_opt, index)
                     self._configlist.append(config)
                     yield config
-            pytest.fail("more than {} live accounts requested.".format(MAX_LIVE_CREATED_ACCOUNTS))
+            pytest.fail("more than {} live accounts requested.".format(self.MAX_LIVE_CREATED_ACCOUNTS))
+
+    def prefetch_liveconfigs(self, count):
+        """concurrently request live configs from a HTTP provider
+        so that at least `count` configs are cached."""
+        liveconfig_opt = self.pytestconfig.getoption("--liveconfig")
+        if not liveconfig_opt or not liveconfig_opt.startswith("http"):
+            return
+        missing = range(len(self._configlist), min(count, self.MAX_LIVE_CREATED_ACCOUNTS))
+        if len(missing) > 0:
+            # create the shared session before the workers start using it
+            self._get_http_session()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(missing), 8)) as executor:
+                futures = [executor.submit(self._request_liveconfig, liveconfig_opt, index) for index in missing]
+            # accounts were created on the provider for all successful requests,
+            # so keep their configs even if other requests failed.
+            errors = [future.exception() for future in futures if future.exception() is not None]
+            self._configlist.extend(future.result() for future in futures if future.exception() is None)
+            if errors:
+                raise errors[0]
+
+    def _request_liveconfig(self, url, index):
+        res = self._get_http_session().post(url, timeout=30)
+        if res.status_code != 200:
+            pytest.fail("newtmpuser count={} code={}: '{}'".format(index, res.status_code, res.text))
+        d = res.json()
+        config = dict(addr=d["email"], mail_pw=d["password"])
+        print("newtmpuser {}: addr={}".format(index, config["addr"]))
+        return config
+
+    def _get_http_session(self):
+        """return a HTTP session which keeps connections to the liveconfig provider alive."""
+        if self._http_session is None:
+            # importing requests is expensive and only needed with a HTTP liveconfig provider
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            self._http_session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=16, pool_maxsize=16, max_retries=Retry(connect=3, backoff_factor=0.3)
+            )
+            self._http_session.mount("http://", adapter)
+            self._http_session.mount("https://", adapter)
+        return self._http_session
 
     def cache_maybe_retrieve_configured_db_files(self, cache_addr, db_target_path):
         db_target_path = pathlib.Path(db_target_path)
@@ -229,8 +304,47 @@ def write_dict_to_dir(dic, target_dir):
         path.write_bytes(content)
 
 
+class _DataCache:
+    """Session-wide index of test data directories and cache of read files.
+
+    Test data doesn't change during a test session, so each data
+    directory is walked only once and each file read only once.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: Dict[str, Dict[str, str]] = {}
+        self._contents: Dict[Tuple[str, str], Any] = {}
+
+    def get_index(self, path: str) -> Dict[str, str]:
+        """return mapping of relative to absolute file paths below path."""
+        try:
+            return self._indexes[path]
+        except KeyError:
+            pass
+        index = self._indexes[path] = {}
+        for dirpath, _, filenames in os.walk(path, followlinks=True):
+            for filename in filenames:
+                fn = os.path.join(dirpath, filename)
+                index[os.path.relpath(fn, path)] = fn
+        return index
+
+    def read(self, fn: str, mode: str) -> Any:
+        try:
+            return self._contents[(fn, mode)]
+        except KeyError:
+            pass
+        with open(fn, mode) as f:
+            content = self._contents[(fn, mode)] = f.read()
+        return content
+
+
+@pytest.fixture(scope="session")
+def _datacache():
+    return _DataCache()
+
+
 @pytest.fixture
-def data(request):
+def data(request, _datacache):
     class Data:
         def __init__(self) -> None:
             # trying to find test data heuristically
@@ -247,17 +361,17 @@ def __init__(self) -> None:
 
         def get_path(self, bn):
             """return path of file or None if it doesn't exist."""
+            relpath = os.path.normpath(bn)
             for path in self.paths:
-                fn = os.path.join(path, *bn.split("/"))
-                if os.path.exists(fn):
+                fn = _datacache.get_index(path).get(relpath)
+                if fn is not None:
                     return fn
-            print("WARNING: path does not exist: {!r}".format(fn))
+            print("WARNING: path does not exist: {!r}".format(bn))
 
         def read_path(self, bn, mode="r"):
             fn = self.get_path(bn)
             if fn is not None:
-                with open(fn, mode) as f:
-                    return f.read()
+                return _datacache.read(fn, mode)
 
     return Data()
 
@@ -320,14 +434,21 @@ def bring_online(self):
         and successfully completing the configuration process.
         """
         print("wait_all_configured finds accounts=", self._account2state)
+        started = []
         for acc, state in self._account2state.items():
             if state == self.CONFIGURED:
                 self._onconfigure_start_io(acc)
-                self._account2state[acc] = self.IDLEREADY
+                started.append(acc)
 
         while self.CONFIGURING in self._account2state.values():
             acc = self._pop_config_success()
             self._onconfigure_start_io(acc)
+            started.append(acc)
+
+        # IO is running for all accounts now so they reach inbox IDLE
+        # concurrently and we only need to wait for the slowest one.
+        for acc in started:
+            self._wait_idle_ready(acc)
             self._account2state[acc] = self.IDLEREADY
         print("finished, account2state", self._account2state)
 
@@ -342,6 +463,8 @@ def _onconfigure_start_io(self, acc):
         self.init_imap(acc)
         self.init_logging(acc)
         acc.start_io()
+
+    def _wait_idle_ready(self, acc):
         print(acc._logid, "waiting for inbox IDLE to become ready")
         acc._evtracker.wait_idle_inbox_ready()
         acc._evtracker.consume_events()
@@ -379,10 +502,12 @@ class ACFactory:
     def __init__(self, request, testprocess, tmpdir, data) -> None:
         self.init_time = time.time()
         self.tmpdir = tmpdir
+        self._tmpdir_str = str(tmpdir)
         self.pytestconfig = request.config
         self.data = data
         self.testprocess = testprocess
         self._liveconfig_producer = testprocess.get_liveconfig_producer()
+        self._liveconfig_count = 0
 
         self._finalizers = []
         self._accounts = []
@@ -399,21 +524,31 @@ def finalize(self):
             fin = self._finalizers.pop()
             fin()
 
-        while self._accounts:
-            acc = self._accounts.pop()
-            if acc is not None:
-                imap = getattr(acc, "direct_imap", None)
-                if imap is not None:
-                    imap.shutdown()
-                    del acc.direct_imap
-                acc.shutdown()
-                acc.disable_logging()
+        accounts = [acc for acc in reversed(self._accounts) if acc is not None]
+        self._accounts.clear()
+        if accounts:
+            # shutting down blocks on the account's IO and event threads,
+            # so shut all accounts down in parallel.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+                futures = [executor.submit(self._shutdown_account, acc) for acc in accounts]
+            # all accounts were shut down, now report the first failure if any
+            for future in futures:
+                future.result()
+
+    def _shutdown_account(self, acc):
+        imap = getattr(acc, "direct_imap", None)
+        if imap is not None:
+            imap.shutdown()
+            del acc.direct_imap
+        acc.shutdown()
+        acc.disable_logging()
 
     def get_next_liveconfig(self):
         """Base function to get functional online configurations
         where we can make valid SMTP and IMAP connections with.
         """
         configdict = next(self._liveconfig_producer).copy()
+        self._liveconfig_count += 1
         if "e2ee_enabled" not in configdict:
             configdict["e2ee_enabled"] = "1"
 
@@ -435,10 +570,12 @@ def get_unconfigured_account(self, closed=False):
     def _getaccount(self, try_cache_addr=None, closed=False):
         logid = "ac{}".format(len(self._accounts) + 1)
         # we need to use fixed database basename for maybe_cache_* functions to work
-        path = self.tmpdir.mkdir(logid).join("dc.db")
+        accdir = os.path.join(self._tmpdir_str, logid)
+        os.mkdir(accdir)
+        path = os.path.join(accdir, "dc.db")
         if try_cache_addr:
             self.testprocess.cache_maybe_retrieve_configured_db_files(try_cache_addr, path)
-        ac = Account(path.strpath, logging=self._logging, closed=closed)
+        ac = Account(path, logging=self._logging, closed=closed)
         ac._logid = logid  # later instantiated FFIEventLogger needs this
         ac._evtracker = ac.add_account_plugin(FFIEventTracker(ac))
         if self.pytestconfig.getoption("--debug-setup"):
@@ -459,6 +596,7 @@ def _preconfigure_key(self, account, addr):
         except IndexError:
             pass
         else:
+            # key file contents are cached session-wide by the data fixture
             fname_pub = self.data.read_path("key/{name}-public.asc".format(name=keyname))
             fname_sec = self.data.read_path("key/{name}-secret.asc".format(name=keyname))
             if fname_pub and fname_sec:
@@ -511,10 +649,7 @@ def new_online_configuring_account(self, cloned_from=None, cache=False, **kwargs
     def prepare_account_from_liveconfig(self, configdict):
         ac = self.get_unconfigured_account()
         assert "addr" in configdict and "mail_pw" in configdict, configdict
-        configdict.setdefault("bcc_self", False)
-        configdict.setdefault("mvbox_move", False)
-        configdict.setdefault("sentbox_watch", False)
-        ac.update_config(configdict)
+        ac.update_config({"bcc_self": False, "mvbox_move": False, "sentbox_watch": False, **configdict})
         self._preconfigure_key(ac, configdict["addr"])
         return ac
 
@@ -528,6 +663,7 @@ def bring_accounts_online(self):
         print("all accounts online")
 
     def get_online_accounts(self, num):
+        self.testprocess.prefetch_liveconfigs(self._liveconfig_count + num)
         accounts = [self.new_online_configuring_account(cache=True) for i in range(num)]
         self.bring_accounts_online()
         # we cache fully configured and started accounts
@@ -536,6 +672,8 @@ def get_online_accounts(self, num):
         return accounts
 
     def run_bot_process(self, module, ffi=True):
+        import subprocess
+
         fn = module.__file__
 
         bot_cfg = self.get_next_liveconfig()
@@ -609,31 +747,89 @@ def acfactory(request, tmpdir, testprocess, data):
             # request.node.add_report_section("call", "imap-server-state", s)
 
 
+class _BotMultiplexer:
+    """Read stdout of all running bot processes from a single thread.
+
+    Bot output is read with non-blocking polling and handed to the
+    owning BotProcess which splits it into lines.  The reader thread
+    is started with the first registered bot and then kept for the
+    whole test process, waiting idle while no bots are running.
+    """
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._registered = threading.Condition(threading.Lock())
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, bot: "BotProcess") -> None:
+        with self._registered:
+            self._selector.register(bot.popen.stdout.fileno(), selectors.EVENT_READ, data=bot)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bot-stdout-thread")
+                self._thread.daemon = True
+                self._thread.start()
+            self._registered.notify()
+
+    def _run(self) -> None:
+        while 1:
+            with self._registered:
+                self._registered.wait_for(self._selector.get_map)
+            for key, _ in self._selector.select(timeout=0.1):
+                try:
+                    data = os.read(key.fd, 4096)
+                    if data:
+                        key.data._feed(data)
+                        continue
+                except Exception as e:
+                    # only fail the affected bot, keep reading the others
+                    print("bot-stdout: reading failed: {!r}".format(e))
+                with self._registered:
+                    self._selector.unregister(key.fd)
+                key.data._feed_eof()
+
+
+_bot_multiplexer = _BotMultiplexer()
+
+
 class BotProcess:
-    stdout_queue: queue.Queue
+    stdout_lines: Deque[Optional[str]]
 
     def __init__(self, popen, addr) -> None:
         self.popen = popen
         self.addr = addr
 
-        # we read stdout as quickly as we can in a thread and make
-        # the (unicode) lines available for readers through a queue.
-        self.stdout_queue = queue.Queue()
-        self.stdout_thread = t = threading.Thread(target=self._run_stdout_thread, name="bot-stdout-thread")
-        t.daemon = True
-        t.start()
-
-    def _run_stdout_thread(self) -> None:
-        try:
-            while 1:
-                line = self.popen.stdout.readline()
-                if not line:
-                    break
-                line = line.strip()
-                self.stdout_queue.put(line)
+        # we read stdout as quickly as we can in a shared reader thread
+        # and make the (unicode) lines available for readers through a deque.
+        self.stdout_lines = collections.deque()
+        # a single reader thread produces and a single test thread
+        # consumes the lines, so no reentrant lock is needed.
+        self._stdout_cond = threading.Condition(threading.Lock())
+        self._stdout_buf = b""
+        _bot_multiplexer.register(self)
+
+    def _feed(self, data: bytes) -> None:
+        *lines, self._stdout_buf = (self._stdout_buf + data).split(b"\n")
+        self._push_lines(lines)
+
+    def _feed_eof(self) -> None:
+        lines = [self._stdout_buf] if self._stdout_buf else []
+        self._stdout_buf = b""
+        self._push_lines(lines, eof=True)
+
+    def _push_lines(self, lines: List[bytes], eof: bool = False) -> None:
+        with self._stdout_cond:
+            for rawline in lines:
+                line = rawline.decode("utf8", errors="replace").strip()
+                self.stdout_lines.append(line)
                 print("bot-stdout: ", line)
-        finally:
-            self.stdout_queue.put(None)
+            if eof:
+                self.stdout_lines.append(None)
+            self._stdout_cond.notify_all()
+
+    def _next_stdout_line(self) -> Optional[str]:
+        with self._stdout_cond:
+            self._stdout_cond.wait_for(lambda: self.stdout_lines)
+            return self.stdout_lines.popleft()
 
     def kill(self) -> None:
         self.popen.kill()
@@ -642,19 +838,20 @@ def wait(self, timeout=None) -> None:
         self.popen.wait(timeout=timeout)
 
     def fnmatch_lines(self, pattern_lines):
-        patterns = [x.strip() for x in Source(pattern_lines.rstrip()).lines if x.strip()]
-        for next_pattern in patterns:
+        patterns = [x for x in (line.strip() for line in Source(pattern_lines.rstrip()).lines) if x]
+        compiled = [re.compile(fnmatch.translate(pattern)) for pattern in patterns]
+        for next_pattern, rex in zip(patterns, compiled):
             print("+++FNMATCH:", next_pattern)
             ignored = []
             while 1:
-                line = self.stdout_queue.get()
+                line = self._next_stdout_line()
                 if line is None:
                     if ignored:
                         print("BOT stdout terminated after these lines")
                         for line in ignored:
                             print(line)
                     raise IOError("BOT stdout-thread terminated")
-                if fnmatch.fnmatch(line, next_pattern):
+                if rex.match(line):
                     print("+++MATCHED:", line)
                     break
                 else:
@@ -689,7 +886,7 @@ def pytest_runtest_makereport(item, call):
     outcome = yield
     rep = outcome.get_result()
 
-    # set a report attribute for each phase of a call, which can
-    # be "setup", "call", "teardown"
-
-    setattr(item, "rep_" + rep.when, rep)
+    # only the report of the "call" phase is used (by the acfactory
+    # fixture to dump extra info on failures)
+    if rep.when == "call":
+        item.rep_call = rep
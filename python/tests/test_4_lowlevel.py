@@ -1,7 +1,9 @@
 import os
 from queue import Queue
 
-from deltachat import capi, const, cutil, register_global_plugin
+import pytest
+
+from deltachat import capi, const, cutil, register_global_plugin, testplugin
 from deltachat.capi import ffi, lib
 from deltachat.hookspec import global_hookimpl
 from deltachat.testplugin import (
@@ -10,6 +12,8 @@
     write_dict_to_dir,
 )
 
+pytest_plugins = "pytester"
+
 # from deltachat.account import EventLogger
 
 
@@ -40,6 +44,7 @@ def test_basic_states(self, acfactory, monkeypatch, testprocess):
         pc.wait_one_configured(acc)
         assert pc._account2state[acc] == pc.CONFIGURED
         monkeypatch.setattr(pc, "_onconfigure_start_io", lambda *args, **kwargs: None)
+        monkeypatch.setattr(pc, "_wait_idle_ready", lambda *args, **kwargs: None)
         pc.bring_online()
         assert pc._account2state[acc] == pc.IDLEREADY
 
@@ -47,6 +52,7 @@ def test_two_accounts_one_waited_all_started(self, monkeypatch, acfactory, testp
         pc = ACSetup(init_time=0.0, testprocess=testprocess)
         monkeypatch.setattr(pc, "init_imap", lambda *args, **kwargs: None)
         monkeypatch.setattr(pc, "_onconfigure_start_io", lambda *args, **kwargs: None)
+        monkeypatch.setattr(pc, "_wait_idle_ready", lambda *args, **kwargs: None)
         ac1 = acfactory.get_unconfigured_account()
         monkeypatch.setattr(ac1, "configure", lambda **kwargs: None)
         pc.start_configure(ac1)
@@ -64,6 +70,24 @@ def test_two_accounts_one_waited_all_started(self, monkeypatch, acfactory, testp
         assert pc._account2state[ac1] == pc.IDLEREADY
         assert pc._account2state[ac2] == pc.IDLEREADY
 
+    def test_bring_online_starts_io_before_waiting(self, monkeypatch, acfactory, testprocess):
+        pc = ACSetup(init_time=0.0, testprocess=testprocess)
+        calls = []
+        monkeypatch.setattr(pc, "_onconfigure_start_io", lambda acc: calls.append(("start_io", acc)))
+        monkeypatch.setattr(pc, "_wait_idle_ready", lambda acc: calls.append(("wait", acc)))
+        ac1 = acfactory.get_unconfigured_account()
+        monkeypatch.setattr(ac1, "configure", lambda **kwargs: None)
+        pc.start_configure(ac1)
+        ac2 = acfactory.get_unconfigured_account()
+        monkeypatch.setattr(ac2, "configure", lambda **kwargs: None)
+        pc.start_configure(ac2)
+        pc._configured_events.put((ac1, True))
+        pc._configured_events.put((ac2, True))
+        pc.bring_online()
+        assert calls == [("start_io", ac1), ("start_io", ac2), ("wait", ac1), ("wait", ac2)]
+        assert pc._account2state[ac1] == pc.IDLEREADY
+        assert pc._account2state[ac2] == pc.IDLEREADY
+
     def test_store_and_retrieve_configured_account_cache(self, acfactory, tmpdir):
         ac1 = acfactory.get_pseudo_configured_account()
         holder = acfactory._acsetup.testprocess
@@ -76,6 +100,108 @@ def test_store_and_retrieve_configured_account_cache(self, acfactory, tmpdir):
         assert len(os.listdir(acdir)) >= 2
 
 
+class TestLoggingHookOption:
+    def test_invalid_value(self, pytester):
+        pytester.makeini("[pytest]\ndeltachat_logging_hook = sometimes\n")
+        pytester.makepyfile("def test_nothing(): pass")
+        result = pytester.runpytest_subprocess()
+        assert result.ret == pytest.ExitCode.USAGE_ERROR
+        result.stderr.fnmatch_lines(["*deltachat_logging_hook must be one of auto, on, off*"])
+
+    @pytest.mark.parametrize("mode, toggles", [("auto", False), ("off", False), ("on", True)])
+    def test_toggles_without_accounts(self, pytester, mode, toggles):
+        pytester.makeini("[pytest]\ndeltachat_logging_hook = {}\n".format(mode))
+        pytester.makepyfile(
+            """
+            def test_toggles(request):
+                (la,) = [p for p in request.config.pluginmanager.get_plugins() if hasattr(p, "_needs_toggle")]
+                assert not la._accounts
+                assert la._needs_toggle(request.node) is {}
+            """.format(
+                toggles
+            )
+        )
+        result = pytester.runpytest_subprocess()
+        result.assert_outcomes(passed=1)
+
+
+def make_testprocess(liveconfig):
+    """return a TestProcess for the given --liveconfig value."""
+
+    class Config:
+        def getoption(self, name):
+            assert name == "--liveconfig"
+            return str(liveconfig)
+
+    return testplugin.TestProcess(pytestconfig=Config())
+
+
+class TestPrefetchLiveconfigs:
+    @pytest.fixture
+    def requested(self, monkeypatch):
+        requested = []
+
+        def request_liveconfig(url, index):
+            requested.append(index)
+            if index == 1 and "fail" in url:
+                raise ValueError("provider failed")
+            return dict(addr="{}@example.org".format(index), mail_pw="123")
+
+        monkeypatch.setattr(testplugin.TestProcess, "_get_http_session", lambda self: None)
+        monkeypatch.setattr(
+            testplugin.TestProcess, "_request_liveconfig", lambda self, url, index: request_liveconfig(url, index)
+        )
+        return requested
+
+    def test_prefetch_count_and_order(self, requested):
+        tp = make_testprocess("https://example.org/new_email")
+        tp.prefetch_liveconfigs(3)
+        assert [x["addr"] for x in tp._configlist] == ["0@example.org", "1@example.org", "2@example.org"]
+        tp.prefetch_liveconfigs(2)
+        assert len(tp._configlist) == 3
+        assert sorted(requested) == [0, 1, 2]
+        tp.prefetch_liveconfigs(testplugin.TestProcess.MAX_LIVE_CREATED_ACCOUNTS + 5)
+        assert len(tp._configlist) == testplugin.TestProcess.MAX_LIVE_CREATED_ACCOUNTS
+        assert [x["addr"] for x in tp._configlist] == [
+            "{}@example.org".format(i) for i in range(testplugin.TestProcess.MAX_LIVE_CREATED_ACCOUNTS)
+        ]
+
+    def test_prefetch_keeps_successful_configs(self, requested):
+        tp = make_testprocess("https://example.org/fail")
+        with pytest.raises(ValueError):
+            tp.prefetch_liveconfigs(3)
+        assert [x["addr"] for x in tp._configlist] == ["0@example.org", "2@example.org"]
+
+    def test_prefetch_ignores_liveconfig_file(self, requested):
+        tp = make_testprocess("/some/liveconfig.txt")
+        tp.prefetch_liveconfigs(3)
+        assert not tp._configlist
+        assert not requested
+
+
+class TestLiveconfigFile:
+    def test_parse(self, tmp_path):
+        p = tmp_path.joinpath("liveconfig")
+        p.write_text("# comment\n\naddr=1@example.org mail_pw=pa=ss\naddr=2@example.org mail_pw=123\n")
+        tp = make_testprocess(p)
+        expected = [
+            {"addr": "1@example.org", "mail_pw": "pa=ss"},
+            {"addr": "2@example.org", "mail_pw": "123"},
+        ]
+        assert list(tp.get_liveconfig_producer()) == expected
+
+        # the file is only parsed once per test process
+        p.write_text("addr=3@example.org mail_pw=123\n")
+        assert list(tp.get_liveconfig_producer()) == expected
+
+    def test_parse_invalid_setting(self, tmp_path):
+        p = tmp_path.joinpath("liveconfig")
+        p.write_text("addr=1@example.org mail_pw\n")
+        tp = make_testprocess(p)
+        with pytest.raises(ValueError):
+            list(tp.get_liveconfig_producer())
+
+
 def test_liveconfig_caching(acfactory, monkeypatch):
     prod = [
         {"addr": "1@example.org", "mail_pw": "123"},
@@ -88,6 +214,30 @@ def test_liveconfig_caching(acfactory, monkeypatch):
     assert "hello" not in d2
 
 
+def test_data_lookup(data):
+    assert data.get_path("d.png") == os.path.join(os.path.dirname(__file__), "data", "d.png")
+    # tests/data/key is a symlink and takes precedence over the test-data fallback
+    assert data.get_path("key/alice-public.asc") == os.path.join(
+        os.path.dirname(__file__), "data", "key", "alice-public.asc"
+    )
+    assert data.get_path("does/not/exist") is None
+    content = data.read_path("key/alice-public.asc")
+    assert "PGP PUBLIC KEY" in content
+    assert data.read_path("key/alice-public.asc") is content
+
+
+def test_data_cache_follows_symlinked_dirs(tmp_path):
+    real = tmp_path.joinpath("real")
+    real.mkdir()
+    real.joinpath("only-here.txt").write_text("content")
+    root = tmp_path.joinpath("root")
+    root.mkdir()
+    root.joinpath("linked").symlink_to(real, target_is_directory=True)
+    datacache = testplugin._DataCache()
+    index = datacache.get_index(str(root))
+    assert index[os.path.join("linked", "only-here.txt")] == str(root.joinpath("linked", "only-here.txt"))
+
+
 def test_empty_context():
     ctx = capi.lib.dc_context_new(capi.ffi.NULL, capi.ffi.NULL, capi.ffi.NULL)
     capi.lib.dc_context_unref(ctx)